@@ -5,10 +5,14 @@
 
 """
 
+import fnmatch
 import glob
 import os
+import re
+import stat
 
 from nuitka import ModuleRegistry, Options
+from nuitka.__past__ import intern
 from nuitka.Errors import NuitkaForbiddenImportEncounter
 from nuitka.freezer.ImportDetection import (
     detectEarlyImports,
@@ -20,7 +24,7 @@ from nuitka.pgo.PGO import decideInclusionFromPGO
 from nuitka.plugins.Plugins import Plugins
 from nuitka.PythonVersions import python_version
 from nuitka.Tracing import recursion_logger
-from nuitka.utils.FileOperations import listDir
+from nuitka.utils.FileOperations import getDirectoryRealPath, listDir
 from nuitka.utils.Importing import getSharedLibrarySuffixes
 from nuitka.utils.ModuleNames import ModuleName
 
@@ -32,10 +36,19 @@ from .Importing import (
 )
 
 
+# The building module imports this one, so it is only imported on first use,
+# but then kept, to avoid the import machinery for every recursion.
+_building_module = None
+
+
 def _recurseTo(module_name, module_filename, module_kind, reason):
-    from nuitka.tree import Building
+    # Lazy import singleton, pylint: disable=global-statement
+    global _building_module
+
+    if _building_module is None:
+        from nuitka.tree import Building as _building_module
 
-    module = Building.buildModule(
+    module = _building_module.buildModule(
         module_name=module_name,
         module_kind=module_kind,
         module_filename=module_filename,
@@ -52,6 +65,19 @@ def _recurseTo(module_name, module_filename, module_kind, reason):
     return module
 
 
+def _internFilename(filename):
+    """Share one string object for equal filenames used as cache keys.
+
+    Python2 can only intern "str" values, but paths can be "unicode" there,
+    and built-in modules have no filename at all.
+    """
+
+    if type(filename) is str:
+        return intern(filename)
+    else:
+        return filename
+
+
 def recurseTo(
     module_name,
     module_filename,
@@ -60,6 +86,8 @@ def recurseTo(
     reason,
     using_module_name,
 ):
+    module_filename = _internFilename(module_filename)
+
     try:
         module = ImportCache.getImportedModuleByNameAndPath(
             module_name, module_filename
@@ -98,6 +126,8 @@ def getRecursionDecisions():
 def decideRecursion(
     using_module_name, module_filename, module_name, module_kind, extra_recursion=False
 ):
+    module_filename = _internFilename(module_filename)
+
     package_part, _remainder = module_name.splitModuleBasename()
 
     if package_part is not None:
@@ -124,8 +154,11 @@ def decideRecursion(
 
     key = using_module_name, module_filename, module_name, module_kind, extra_recursion
 
-    if key not in _recursion_decision_cache:
-        _recursion_decision_cache[key] = _decideRecursion(
+    # Decisions are never None, so one lookup tells if it's cached.
+    result = _recursion_decision_cache.get(key)
+
+    if result is None:
+        result = _decideRecursion(
             using_module_name,
             module_filename,
             module_name,
@@ -133,17 +166,77 @@ def decideRecursion(
             extra_recursion,
         )
 
+        _recursion_decision_cache[key] = result
+
         # If decided true, give the plugins a chance to e.g. add more hard
         # module information, this indicates tentatively, that a module might
         # get used, but it may also not happen at all.
-        if _recursion_decision_cache[key][0]:
+        if result[0]:
             Plugins.onModuleUsageLookAhead(
                 module_name=module_name,
                 module_filename=module_filename,
                 module_kind=module_kind,
             )
 
-    return _recursion_decision_cache[key]
+    return result
+
+
+_pgo_compilation_mode_cache = {}
+
+
+def _makeShellPatternsRegex(patterns):
+    """Compile module name shell patterns into one regular expression.
+
+    This is only a quick pre-check, it matches everything that the
+    "ModuleName.matchesToShellPatterns" would match, such that only for
+    actual hits, the slower explaining match needs to be done.
+    """
+
+    alternatives = []
+
+    for pattern in patterns:
+        pattern = os.path.normcase(pattern)
+
+        alternatives.append(re.escape(pattern) + r"(?:\..*)?\Z")
+        alternatives.append(fnmatch.translate(pattern))
+        alternatives.append(fnmatch.translate(pattern + ".*"))
+
+    if not alternatives:
+        return None
+
+    return re.compile(
+        "|".join("(?:%s)" % alternative for alternative in alternatives), re.S
+    )
+
+
+_shell_patterns_cache = {}
+
+
+def _matchesToOptionShellPatterns(module_name, patterns_getter):
+    """Match a module name against module name patterns from options.
+
+    The options do not change after parsing, so the patterns and their
+    regular expression are only computed once per getter.
+    """
+
+    if patterns_getter not in _shell_patterns_cache:
+        patterns = tuple(patterns_getter())
+
+        _shell_patterns_cache[patterns_getter] = (
+            patterns,
+            _makeShellPatternsRegex(patterns),
+        )
+
+    patterns, patterns_regex = _shell_patterns_cache[patterns_getter]
+
+    if (
+        patterns_regex is None
+        or patterns_regex.match(os.path.normcase(module_name.asString())) is None
+    ):
+        return False, None
+
+    # Only for hits, find out which pattern matched and how.
+    return module_name.matchesToShellPatterns(patterns=patterns)
 
 
 def _decideRecursion(
@@ -151,10 +244,17 @@ def _decideRecursion(
 ):
     # Many branches, which make decisions immediately, by returning
     # pylint: disable=too-many-branches,too-many-return-statements
+
+    # Lazy import singleton, pylint: disable=global-statement
+    global _building_module
+
     if module_name == "__main__":
         return False, "Main program is not followed to a second time."
 
-    if module_kind == "extension" and not Options.isStandaloneMode():
+    # Options used repeatedly below, they do not change.
+    is_standalone = Options.isStandaloneMode()
+
+    if module_kind == "extension" and not is_standalone:
         return False, "Extension modules cannot be inspected."
 
     if module_kind == "built-in":
@@ -195,8 +295,8 @@ def _decideRecursion(
         if deciding_plugin.plugin_name != "anti-bloat"
     ]
 
-    no_case, reason = module_name.matchesToShellPatterns(
-        patterns=Options.getShallFollowInNoCase()
+    no_case, reason = _matchesToOptionShellPatterns(
+        module_name=module_name, patterns_getter=Options.getShallFollowInNoCase
     )
 
     if no_case:
@@ -208,8 +308,8 @@ def _decideRecursion(
 
         return False, "Module %s instructed by user to not follow to." % reason
 
-    any_case, reason = module_name.matchesToShellPatterns(
-        patterns=Options.getShallFollowModules()
+    any_case, reason = _matchesToOptionShellPatterns(
+        module_name=module_name, patterns_getter=Options.getShallFollowModules
     )
 
     if any_case:
@@ -227,26 +327,31 @@ def _decideRecursion(
     if extra_recursion:
         return True, "Lives in user provided directory."
 
-    if module_kind == "extension" and Options.isStandaloneMode():
+    if module_kind == "extension" and is_standalone:
         return True, "Extension module needed for standalone mode."
 
     # PGO decisions are not overruling plugins, but all command line options, they are
     # supposed to be applied already.
 
-    if not is_stdlib or Options.shallFollowStandardLibrary():
-        # TODO: Bad placement of this function or should PGO also know about
-        # bytecode modules loaded or not.
-        from nuitka.tree.Building import decideCompilationMode
+    follow_stdlib = Options.shallFollowStandardLibrary()
+
+    if not is_stdlib or follow_stdlib:
+        key = module_name, module_filename
 
-        if (
-            decideCompilationMode(
+        if key not in _pgo_compilation_mode_cache:
+            # TODO: Bad placement of this function or should PGO also know
+            # about bytecode modules loaded or not.
+            if _building_module is None:
+                from nuitka.tree import Building as _building_module
+
+            _pgo_compilation_mode_cache[key] = _building_module.decideCompilationMode(
                 is_top=False,
                 module_name=module_name,
                 module_filename=module_filename,
                 for_pgo=True,
             )
-            == "compiled"
-        ):
+
+        if _pgo_compilation_mode_cache[key] == "compiled":
             pgo_decision = decideInclusionFromPGO(
                 module_name=module_name,
                 module_kind=module_kind,
@@ -255,11 +360,7 @@ def _decideRecursion(
             if pgo_decision is not None:
                 return pgo_decision, "PGO based decision"
 
-    if (
-        is_stdlib
-        and not Options.isStandaloneMode()
-        and not Options.shallFollowStandardLibrary()
-    ):
+    if is_stdlib and not is_standalone and not follow_stdlib:
         return (
             False,
             "Not following into stdlib unless standalone or requested to follow into stdlib.",
@@ -281,82 +382,208 @@ def _decideRecursion(
     )
 
 
+_abspath_cache = {}
+
+
+def _getAbsolutePathCached(path):
+    """Cached "os.path.abspath", the same paths are checked many times."""
+
+    if path not in _abspath_cache:
+        _abspath_cache[path] = os.path.abspath(path)
+
+    return _abspath_cache[path]
+
+
+_path_status_cache = {}
+
+
+def _getPathStatusCached(path):
+    """Cached directory and file status of a path.
+
+    Returns:
+        Tuple of two booleans, is directory, and is file, both from only
+        one "os.stat" call, negative results are cached too. Nothing is
+        changed on disk while these are checked, so there is no invalidation.
+    """
+
+    path = _getAbsolutePathCached(path)
+
+    if path not in _path_status_cache:
+        try:
+            mode = os.stat(path).st_mode
+        except (OSError, ValueError):
+            _path_status_cache[path] = False, False
+        else:
+            _path_status_cache[path] = stat.S_ISDIR(mode), stat.S_ISREG(mode)
+
+    return _path_status_cache[path]
+
+
+def _getModulePathForComparison(path):
+    # Packages are compared by their directory, not their "__init__.py" file,
+    # the trailing separator kept by the slicing is removed by "abspath".
+    sep_index = path.rfind(os.sep)
+
+    if os.altsep is not None:
+        sep_index = max(sep_index, path.rfind(os.altsep))
+
+    if path[sep_index + 1 :] == "__init__.py":
+        path = path[: sep_index + 1]
+
+    return _getAbsolutePathCached(path)
+
+
 def isSameModulePath(path1, path2):
-    if os.path.basename(path1) == "__init__.py":
-        path1 = os.path.dirname(path1)
-    if os.path.basename(path2) == "__init__.py":
-        path2 = os.path.dirname(path2)
+    return _getModulePathForComparison(path1) == _getModulePathForComparison(path2)
 
-    return os.path.abspath(path1) == os.path.abspath(path2)
 
+_show_inclusion = None
 
-def _addIncludedModule(module, package_only):
-    # Many branches, for the decision is very complex
-    # pylint: disable=too-many-branches
 
-    if Options.isShowInclusion():
-        recursion_logger.info(
-            "Included '%s' as '%s'."
-            % (
-                module.getFullName(),
-                module,
+def _isShowInclusion():
+    """Cached value of "--show-modules", options do not change after parsing."""
+
+    # Caching only, pylint: disable=global-statement
+    global _show_inclusion
+
+    if _show_inclusion is None:
+        _show_inclusion = Options.isShowInclusion()
+
+    return _show_inclusion
+
+
+def _isDirectoryEntry(entry):
+    # Like "os.path.isdir", errors, e.g. for permissions behind a symlink,
+    # mean it is not a directory.
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+def _getPackageDirContents(package_dir):
+    """Get the contents of a package directory in one pass.
+
+    Returns:
+        Tuple of sorted list of tuples of full filename, basename, and if it
+        is a package directory, and a set of all basenames for lookups, these
+        are normalized with "os.path.normcase" for use on Windows.
+
+    Notes:
+        With Python3.6 or higher, the directory entries know their type
+        already, and every directory is a package, so no extra "stat" calls
+        are needed for each entry.
+    """
+
+    if python_version < 0x360:
+        sub_entries = [
+            (sub_path, sub_filename, isPackageDir(sub_path))
+            for sub_path, sub_filename in listDir(package_dir)
+        ]
+    else:
+        with os.scandir(getDirectoryRealPath(package_dir)) as entries:
+            sub_entries = sorted(
+                (
+                    os.path.join(package_dir, entry.name),
+                    entry.name,
+                    "." not in entry.name and _isDirectoryEntry(entry),
+                )
+                for entry in entries
             )
-        )
 
-    ImportCache.addImportedModule(module)
+    return sub_entries, set(
+        os.path.normcase(sub_filename) for _, sub_filename, _ in sub_entries
+    )
 
-    if module.isCompiledPythonPackage() or module.isUncompiledPythonPackage():
-        package_filename = module.getFilename()
 
-        if os.path.isdir(package_filename):
-            # Must be a namespace package.
-            assert python_version >= 0x300
+_package_dir_ignored_filenames = frozenset(("__init__.py", "__pycache__"))
 
-            package_dir = package_filename
 
-            # Only include it, if it contains actual modules, which will
-            # recurse to this one and find it again.
-        else:
-            package_dir = os.path.dirname(package_filename)
+def _addIncludedPackage(module, package_only):
+    package_filename = module.getFilename()
 
-            # Real packages will always be included.
-            ModuleRegistry.addRootModule(module)
+    if _getPathStatusCached(package_filename)[0]:
+        # Must be a namespace package.
+        assert python_version >= 0x300
 
-        if Options.isShowInclusion():
-            recursion_logger.info("Package directory '%s'." % package_dir)
+        package_dir = package_filename
 
-        if not package_only:
-            for sub_path, sub_filename in listDir(package_dir):
-                if sub_filename in ("__init__.py", "__pycache__"):
-                    continue
+        # Only include it, if it contains actual modules, which will
+        # recurse to this one and find it again.
+    else:
+        package_dir = os.path.dirname(package_filename)
 
-                if isPackageDir(sub_path) and not os.path.exists(sub_path + ".py"):
-                    checkPluginSinglePath(
-                        sub_path,
-                        module_package=module.getFullName(),
-                        package_only=False,
-                    )
-                elif sub_path.endswith(".py"):
-                    checkPluginSinglePath(
-                        sub_path,
-                        module_package=module.getFullName(),
-                        package_only=False,
-                    )
-
-    elif module.isCompiledPythonModule() or module.isUncompiledPythonModule():
+        # Real packages will always be included.
         ModuleRegistry.addRootModule(module)
-    elif module.isPythonExtensionModule():
-        if Options.isStandaloneMode():
-            ModuleRegistry.addRootModule(module)
-    else:
-        assert False, module
+
+    if _isShowInclusion():
+        recursion_logger.info("Package directory '%s'." % package_dir)
+
+    if not package_only:
+        sub_entries, sub_filenames = _getPackageDirContents(package_dir)
+        module_package = module.getFullName()
+
+        for sub_path, sub_filename, is_package_dir in sub_entries:
+            if sub_filename in _package_dir_ignored_filenames:
+                continue
+
+            # Package directories never have a ".py" suffix, so checking for
+            # the more common module files first is the same.
+            if sub_filename.endswith(".py") or (
+                is_package_dir
+                and os.path.normcase(sub_filename + ".py") not in sub_filenames
+            ):
+                checkPluginSinglePath(
+                    sub_path,
+                    module_package=module_package,
+                    package_only=False,
+                )
+
+
+def _addIncludedPythonModule(module, package_only):
+    # Same signature for all handlers, pylint: disable=unused-argument
+    ModuleRegistry.addRootModule(module)
+
+
+def _addIncludedExtensionModule(module, package_only):
+    # Same signature for all handlers, pylint: disable=unused-argument
+    if Options.isStandaloneMode():
+        ModuleRegistry.addRootModule(module)
+
+
+# Handlers by module node kind, the package kinds must scan their directory.
+_included_module_handlers = {
+    "COMPILED_PYTHON_PACKAGE": _addIncludedPackage,
+    "COMPILED_PYTHON_NAMESPACE_PACKAGE": _addIncludedPackage,
+    "UNCOMPILED_PYTHON_PACKAGE": _addIncludedPackage,
+    "COMPILED_PYTHON_MODULE": _addIncludedPythonModule,
+    "PYTHON_MAIN_MODULE": _addIncludedPythonModule,
+    "UNCOMPILED_PYTHON_MODULE": _addIncludedPythonModule,
+    "PYTHON_EXTENSION_MODULE": _addIncludedExtensionModule,
+}
+
+
+def _addIncludedModule(module, package_only):
+    if _isShowInclusion():
+        recursion_logger.info(
+            "Included '%s' as '%s'."
+            % (
+                module.getFullName(),
+                module,
+            )
+        )
+
+    ImportCache.addImportedModule(module)
+
+    assert module.kind in _included_module_handlers, module
+    _included_module_handlers[module.kind](module=module, package_only=package_only)
 
 
 def checkPluginSinglePath(plugin_filename, module_package, package_only):
     # The importing wants these to be unique.
-    plugin_filename = os.path.abspath(plugin_filename)
+    plugin_filename = _getAbsolutePathCached(plugin_filename)
 
-    if Options.isShowInclusion():
+    if _isShowInclusion():
         recursion_logger.info(
             "Checking detail plug-in path '%s' '%s':"
             % (plugin_filename, module_package)
@@ -409,14 +636,16 @@ the compiled result, and therefore asking to include them makes no sense.
 
 
 def checkPluginPath(plugin_filename, module_package):
-    if Options.isShowInclusion():
+    if _isShowInclusion():
         recursion_logger.info(
             "Checking top level inclusion path '%s' '%s'."
             % (plugin_filename, module_package)
         )
 
     # Files and package directories are handled here.
-    if os.path.isfile(plugin_filename) or isPackageDir(plugin_filename):
+    is_dir, is_file = _getPathStatusCached(plugin_filename)
+
+    if is_file or isPackageDir(plugin_filename):
         checkPluginSinglePath(
             plugin_filename,
             module_package=module_package,
@@ -424,7 +653,7 @@ def checkPluginPath(plugin_filename, module_package):
         )
     # This effectively only covers files known to not be packages due to name
     # or older Python version.
-    elif os.path.isdir(plugin_filename):
+    elif is_dir:
         for sub_path, sub_filename in listDir(plugin_filename):
             assert sub_filename != "__init__.py"
 
@@ -436,13 +665,13 @@ def checkPluginPath(plugin_filename, module_package):
                 )
                 continue
 
-            for suffix in getSharedLibrarySuffixes():
-                if sub_path.endswith(suffix):
-                    checkPluginSinglePath(
-                        sub_path,
-                        module_package=None,
-                        package_only=False,
-                    )
+            # The suffixes are a tuple, so this checks them all at once.
+            if sub_path.endswith(getSharedLibrarySuffixes()):
+                checkPluginSinglePath(
+                    sub_path,
+                    module_package=None,
+                    package_only=False,
+                )
 
     else:
         recursion_logger.warning(
@@ -450,21 +679,64 @@ def checkPluginPath(plugin_filename, module_package):
         )
 
 
+def _getFilenamesFromPattern(pattern):
+    """Yield the files matching a glob pattern.
+
+    For a pattern with wildcards only in the last part, the directory is
+    scanned once, and the file type comes with the directory entry, so no
+    extra "stat" is needed per match. Everything else is left to "glob".
+    """
+
+    dirname, basename = os.path.split(pattern)
+
+    if (
+        python_version < 0x360
+        or glob.has_magic(dirname)
+        or not glob.has_magic(basename)
+    ):
+        for filename in glob.iglob(pattern):
+            if _getPathStatusCached(filename)[1]:
+                yield filename
+
+        return
+
+    try:
+        entries = os.scandir(dirname or os.curdir)
+    except OSError:
+        return
+
+    # Like "glob", hidden files are only matched by patterns asking for them.
+    include_hidden = basename.startswith(".")
+
+    with entries:
+        for entry in entries:
+            if entry.name.startswith(".") and not include_hidden:
+                continue
+
+            if not fnmatch.fnmatch(entry.name, basename):
+                continue
+
+            try:
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+
+            yield os.path.join(dirname, entry.name)
+
+
 def checkPluginFilenamePattern(pattern):
-    if Options.isShowInclusion():
+    if _isShowInclusion():
         recursion_logger.info("Checking plug-in pattern '%s':" % pattern)
 
     assert not os.path.isdir(pattern), pattern
 
     found = False
 
-    for filename in glob.iglob(pattern):
+    for filename in _getFilenamesFromPattern(pattern):
         if filename.endswith(".pyc"):
             continue
 
-        if not os.path.isfile(filename):
-            continue
-
         found = True
         checkPluginSinglePath(
             filename,
@@ -484,6 +756,10 @@ def considerUsedModules(module, pass_count):
     if module.reason == "stdlib":
         return
 
+    # Same modules are often used multiple times, e.g. in different branches,
+    # but only the first usage can make a difference.
+    considered_modules = set()
+
     for used_module in module.getUsedModules():
         # The pass number is used to indicate if stdlib modules yet, or only them
 
@@ -506,6 +782,13 @@ def considerUsedModules(module, pass_count):
         if used_module.filename is None:
             continue
 
+        key = used_module.module_name, used_module.filename
+
+        if key in considered_modules:
+            continue
+
+        considered_modules.add(key)
+
         try:
             decision, decision_reason = decideRecursion(
                 using_module_name=module.getFullName(),